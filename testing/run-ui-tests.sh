@@ -187,6 +187,7 @@ compare_screenshots() {
         --baseline "$BASELINE_DIR" \
         --current "$SCREENSHOTS_DIR" \
         --output "$OUTPUT_DIR/visual-regression" \
+        --cache-dir "$PROJECT_ROOT/.screenshot-cache" \
         --fail-on-diff
 
     echo -e "${GREEN}✅ Screenshot comparison completed${NC}"
@@ -7,41 +7,379 @@ This script compares current screenshots with baseline images and generates repo
 import os
 import sys
 import json
+import hashlib
+import sqlite3
+import struct
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 import cv2
 import numpy as np
-from skimage.metrics import structural_similarity as ssim
-from PIL import Image, ImageDraw, ImageFont
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the json module
+    orjson = None
+
+
+# Bump whenever comparison logic or result format changes, so results
+# cached by older versions of this script are not reused
+CACHE_VERSION = 2
+
+# SSIM window and stabilising constants (same defaults as skimage.metrics)
+SSIM_WIN_SIZE = 7
+SSIM_K1 = 0.01
+SSIM_K2 = 0.03
+
+# Bins per channel for the color histogram comparison
+HIST_BINS = 64
+
+# zlib level for diff images; they are viewed once, so favour encode speed
+DIFF_PNG_COMPRESSION = 1
+
+
+def fast_ssim(img1: np.ndarray, img2: np.ndarray) -> Tuple[float, np.ndarray]:
+    """Compute SSIM of two 8-bit grayscale images using box filters.
+
+    Every local statistic is a float32 box-filter pass, which matches
+    skimage's uniform-window SSIM with less memory traffic.
+    """
+    a = img1.astype(np.float32) / 255
+    b = img2.astype(np.float32) / 255
+    window = (SSIM_WIN_SIZE, SSIM_WIN_SIZE)
+
+    mu1 = cv2.boxFilter(a, -1, window, borderType=cv2.BORDER_REFLECT)
+    mu2 = cv2.boxFilter(b, -1, window, borderType=cv2.BORDER_REFLECT)
+    mu1_sq = cv2.boxFilter(a * a, -1, window, borderType=cv2.BORDER_REFLECT)
+    mu2_sq = cv2.boxFilter(b * b, -1, window, borderType=cv2.BORDER_REFLECT)
+    mu12 = cv2.boxFilter(a * b, -1, window, borderType=cv2.BORDER_REFLECT)
+
+    # Unbiased (sample) covariance, as in skimage
+    n = SSIM_WIN_SIZE * SSIM_WIN_SIZE
+    cov_norm = n / (n - 1)
+    sigma1_sq = cov_norm * (mu1_sq - mu1 * mu1)
+    sigma2_sq = cov_norm * (mu2_sq - mu2 * mu2)
+    sigma12 = cov_norm * (mu12 - mu1 * mu2)
+
+    c1 = SSIM_K1 ** 2
+    c2 = SSIM_K2 ** 2
+    num = (2 * mu1 * mu2 + c1) * (2 * sigma12 + c2)
+    den = (mu1 * mu1 + mu2 * mu2 + c1) * (sigma1_sq + sigma2_sq + c2)
+    ssim_map = num / den
+
+    # Ignore the filter border when averaging, like skimage does
+    pad = (SSIM_WIN_SIZE - 1) // 2
+    score = ssim_map[pad:-pad, pad:-pad].mean(dtype=np.float64)
+
+    return float(score), ssim_map
+
+
+def pixel_difference(img1: np.ndarray, img2: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Return the absolute difference image and the percentage of differing values."""
+    diff = cv2.absdiff(img1, img2)
+    return diff, (np.count_nonzero(diff) / diff.size) * 100
+
+
+def scaled_ssim(img1: np.ndarray, img2: np.ndarray, scale: float) -> Tuple[float, np.ndarray]:
+    """Compute SSIM on copies of both images downsampled by scale.
+
+    The returned map has the downsampled size. Images that would shrink
+    below one SSIM window are compared at full resolution.
+    """
+    if scale < 1 and min(img1.shape[:2]) * scale >= SSIM_WIN_SIZE:
+        img1 = cv2.resize(img1, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        img2 = cv2.resize(img2, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    return fast_ssim(img1, img2)
+
+
+def _init_worker():
+    """Keep OpenCV single-threaded inside pool workers to avoid oversubscription."""
+    cv2.setNumThreads(1)
+
+
+# Image comparison runs at module level so worker processes can pickle it
+
+def compare_single_image(baseline_path: Path, current_path: Path, name: str,
+                         thresholds: Dict, output_dir: Path, options: Dict) -> Dict:
+    """Compare two images and return detailed analysis.
+
+    With options["fast"], images are decoded straight to grayscale and the
+    histogram comparison and difference visualization are skipped. The pixel
+    difference and its threshold then see luminance only, so a colour change
+    that keeps the same luminance passes. SSIM is computed at
+    options["ssim_scale"] of the original resolution.
+    """
+    print(f"📸 Comparing: {name}")
+    fast = options["fast"]
+
+    try:
+        # Load images; the fast path only needs luminance
+        read_flag = cv2.IMREAD_GRAYSCALE if fast else cv2.IMREAD_COLOR
+        baseline = cv2.imread(str(baseline_path), read_flag)
+        current = cv2.imread(str(current_path), read_flag)
+
+        if baseline is None or current is None:
+            return {
+                "name": name,
+                "status": "error",
+                "error": "Failed to load images",
+                "baseline_exists": baseline is not None,
+                "current_exists": current is not None
+            }
+
+        # Resize images to match if needed
+        if baseline.shape != current.shape:
+            print(f"  📏 Resizing images: {baseline.shape} vs {current.shape}")
+            min_height = min(baseline.shape[0], current.shape[0])
+            min_width = min(baseline.shape[1], current.shape[1])
+            baseline = cv2.resize(baseline, (min_width, min_height))
+            current = cv2.resize(current, (min_width, min_height))
+
+        # Calculate pixel differences
+        diff, diff_percentage = pixel_difference(baseline, current)
+
+        hist_diff = None
+        if diff_percentage == 0:
+            # Decoded pixels are identical (e.g. only PNG metadata differs),
+            # so SSIM and histogram correlation are exactly 1
+            ssim_score = 1.0
+            ssim_diff = np.ones(baseline.shape[:2], dtype=np.float32)
+            if not fast:
+                hist_diff = 1.0
+        else:
+            # Convert to grayscale for SSIM
+            if fast:
+                baseline_gray, current_gray = baseline, current
+            else:
+                baseline_gray = cv2.cvtColor(baseline, cv2.COLOR_BGR2GRAY)
+                current_gray = cv2.cvtColor(current, cv2.COLOR_BGR2GRAY)
+
+            # Calculate SSIM, downsampled if requested
+            ssim_score, ssim_diff = scaled_ssim(baseline_gray, current_gray,
+                                                options["ssim_scale"])
+
+            # Calculate color histogram differences
+            if not fast:
+                hist_diff = calculate_histogram_difference(baseline, current)
+
+        # Determine if images match
+        is_match = (
+            ssim_score >= thresholds["ssim_threshold"] and
+            diff_percentage <= thresholds["pixel_diff_threshold"]
+        )
+
+        # Generate difference visualization
+        diff_image = None
+        if not fast:
+            height, width = baseline.shape[:2]
+            if ssim_diff.shape != (height, width):
+                if is_match:
+                    ssim_diff = cv2.resize(ssim_diff, (width, height))
+                else:
+                    # Failures are reviewed closely; show the full-resolution map
+                    _, ssim_diff = fast_ssim(baseline_gray, current_gray)
+
+            diff_image_path = create_difference_visualization(
+                baseline, current, diff, ssim_diff, name, output_dir
+            )
+            diff_image = str(diff_image_path.relative_to(output_dir))
+
+        result = {
+            "name": name,
+            "status": "pass" if is_match else "fail",
+            "metrics": {
+                "ssim_score": float(ssim_score),
+                "pixel_diff_percentage": float(diff_percentage),
+                "histogram_difference": float(hist_diff) if hist_diff is not None else None,
+                "baseline_shape": list(baseline.shape),
+                "current_shape": list(current.shape)
+            },
+            "thresholds": dict(thresholds),
+            "diff_image": diff_image,
+            "baseline_path": str(baseline_path),
+            "current_path": str(current_path)
+        }
+
+        # Log result
+        status_emoji = "✅" if is_match else "❌"
+        print(f"  {status_emoji} SSIM: {ssim_score:.3f}, Diff: {diff_percentage:.2f}%")
+
+        return result
+
+    except Exception as e:
+        return {
+            "name": name,
+            "status": "error",
+            "error": str(e),
+            "baseline_path": str(baseline_path),
+            "current_path": str(current_path)
+        }
+
+def calculate_histogram_difference(img1: np.ndarray, img2: np.ndarray) -> float:
+    """Calculate histogram difference between two images.
+
+    Uses one 64-bin histogram per channel and averages the correlations,
+    instead of a sparse 256x256x256 joint histogram.
+    """
+    correlation = 0.0
+    for channel in (0, 1, 2):
+        hist1 = cv2.calcHist([img1], [channel], None, [HIST_BINS], [0, 256])
+        hist2 = cv2.calcHist([img2], [channel], None, [HIST_BINS], [0, 256])
+        cv2.normalize(hist1, hist1)
+        cv2.normalize(hist2, hist2)
+        correlation += cv2.compareHist(hist1, hist2, cv2.HISTCMP_CORREL)
+
+    return correlation / 3
+
+def create_difference_visualization(baseline: np.ndarray, current: np.ndarray,
+                                    diff: np.ndarray, ssim_diff: np.ndarray, name: str,
+                                    output_dir: Path) -> Path:
+    """Create a comprehensive difference visualization."""
+
+    # Convert SSIM diff to heatmap; 255 * (1 - ssim) and the uint8 cast in one pass
+    ssim_heatmap = cv2.convertScaleAbs(ssim_diff.astype(np.float32, copy=False),
+                                       alpha=-255.0, beta=255.0)
+    ssim_colored = cv2.applyColorMap(ssim_heatmap, cv2.COLORMAP_JET)
+
+    # Place baseline, current, diff and ssim side by side
+    width = baseline.shape[1]
+    combined = cv2.hconcat([baseline, current, diff, ssim_colored])
+
+    # Extra space above and below for labels
+    combined = cv2.copyMakeBorder(combined, 50, 50, 0, 0, cv2.BORDER_CONSTANT, value=0)
+
+    # Add labels
+    labels = ["Baseline", "Current", "Pixel Diff", "SSIM Diff"]
+    for i, label in enumerate(labels):
+        (text_width, _), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+        x = i * width + (width - text_width) // 2
+        cv2.putText(combined, label, (x, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7,
+                    (255, 255, 255), 2)
+
+    # Save combined image
+    diff_path = output_dir / f"{name}_diff.png"
+    if not cv2.imwrite(str(diff_path), combined, [cv2.IMWRITE_PNG_COMPRESSION, DIFF_PNG_COMPRESSION]):
+        raise IOError(f"Failed to write {diff_path}")
+
+    return diff_path
+
+
+def png_shape(path: Path, fast: bool) -> Optional[List[int]]:
+    """Read the decoded array shape from a PNG header without decoding the image."""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(24)
+    except OSError:
+        return None
+
+    if len(header) < 24 or header[:8] != b"\x89PNG\r\n\x1a\n":
+        return None
+
+    width, height = struct.unpack(">II", header[16:24])
+    return [height, width] if fast else [height, width, 3]
+
+
+def identical_result(baseline_path: Path, current_path: Path, name: str,
+                     thresholds: Dict, options: Dict) -> Dict:
+    """Build the result for a pair whose files are byte-for-byte identical.
+
+    Has the same fields as compare_single_image results; identical pairs
+    get no difference visualization.
+    """
+    print(f"📸 Comparing: {name}")
+    print("  ✅ Identical files")
+    fast = options["fast"]
+
+    return {
+        "name": name,
+        "status": "pass",
+        "metrics": {
+            "ssim_score": 1.0,
+            "pixel_diff_percentage": 0.0,
+            "histogram_difference": None if fast else 1.0,
+            "baseline_shape": png_shape(baseline_path, fast),
+            "current_shape": png_shape(current_path, fast)
+        },
+        "thresholds": dict(thresholds),
+        "diff_image": None,
+        "baseline_path": str(baseline_path),
+        "current_path": str(current_path)
+    }
+
+
+def scan_screenshots(directory: Path) -> Dict[str, os.DirEntry]:
+    """Map screenshot names to the directory entries of their PNG files."""
+    with os.scandir(directory) as entries:
+        return {
+            entry.name[:-len(".png")]: entry
+            for entry in entries
+            if entry.name.endswith(".png") and entry.is_file()
+        }
+
+
+def _compare_pair(task: Tuple) -> Dict:
+    """Unpack a work item for ProcessPoolExecutor.map."""
+    return compare_single_image(*task)
+
+
 class ScreenshotComparator:
-    def __init__(self, baseline_dir: str, current_dir: str, output_dir: str):
+    def __init__(self, baseline_dir: str, current_dir: str, output_dir: str,
+                 cache_dir: Optional[str] = None):
         self.baseline_dir = Path(baseline_dir)
         self.current_dir = Path(current_dir)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
+        # Caches persist across runs only when a cache directory is given;
+        # kept apart from output_dir, which is uploaded as artifacts
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
         # Comparison thresholds
         self.ssim_threshold = 0.95  # Structural similarity threshold
         self.pixel_diff_threshold = 0.02  # Percentage of different pixels allowed
         self.color_tolerance = 30  # RGB color difference tolerance
 
+        # Grayscale-only comparison without histograms or diff images
+        self.fast = False
+
+        # Resolution factor for the SSIM pass (1.0 = full resolution)
+        self.ssim_scale = 1.0
+
         # Results storage
         self.comparison_results = []
 
+        # File digests keyed by path, reused while mtime and size are unchanged
+        self.hash_cache = {}
+
+        # Comparison results from previous runs, keyed by file contents and thresholds
+        self.result_cache = None
+
+        if self.cache_dir:
+            self.hash_cache_path = self.cache_dir / "hash_cache.json"
+            self.hash_cache = self.load_hash_cache()
+
+            self.result_cache = sqlite3.connect(self.cache_dir / "cache.db")
+            self.result_cache.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, result TEXT)"
+            )
+
     def compare_screenshots(self) -> Dict:
         """Compare all screenshots and return comprehensive results."""
         print("🔍 Starting screenshot comparison...")
 
-        baseline_files = list(self.baseline_dir.glob("*.png"))
-        current_files = list(self.current_dir.glob("*.png"))
+        baseline_entries = scan_screenshots(self.baseline_dir)
+        current_entries = scan_screenshots(self.current_dir)
 
         # Find matching pairs
-        baseline_names = {f.stem for f in baseline_files}
-        current_names = {f.stem for f in current_files}
+        baseline_names = baseline_entries.keys()
+        current_names = current_entries.keys()
 
         # Report missing files
         missing_baseline = current_names - baseline_names
@@ -52,177 +390,206 @@ class ScreenshotComparator:
         if missing_current:
             print(f"⚠️  Missing current images: {missing_current}")
 
-        # Compare matching pairs
+        # Compare matching pairs in parallel, one image pair per task
         common_names = baseline_names & current_names
+        thresholds = {
+            "ssim_threshold": self.ssim_threshold,
+            "pixel_diff_threshold": self.pixel_diff_threshold
+        }
 
-        for name in common_names:
-            baseline_path = self.baseline_dir / f"{name}.png"
-            current_path = self.current_dir / f"{name}.png"
+        options = {
+            "fast": self.fast,
+            "ssim_scale": self.ssim_scale
+        }
 
-            result = self.compare_single_image(baseline_path, current_path, name)
-            self.comparison_results.append(result)
+        # Results keyed by name, reported in name order once all are in
+        results_by_name = {}
+        tasks = []
+        task_keys = []
+        for name in sorted(common_names):
+            baseline_entry = baseline_entries[name]
+            current_entry = current_entries[name]
+            baseline_path = Path(baseline_entry.path)
+            current_path = Path(current_entry.path)
+
+            # Byte-identical files pass without being decoded
+            if self.files_identical(baseline_entry, current_entry):
+                results_by_name[name] = identical_result(
+                    baseline_path, current_path, name, thresholds, options
+                )
+                continue
+
+            # Unchanged pairs reuse the result from a previous run
+            key = None
+            if self.result_cache is not None:
+                try:
+                    key = self.result_cache_key(baseline_entry, current_entry, name,
+                                                thresholds, options)
+                except OSError:
+                    # Unreadable or vanished file; the worker reports the error
+                    key = None
+
+            if key is not None:
+                cached = self.cached_result(key)
+                if cached is not None:
+                    print(f"📸 Comparing: {name}")
+                    print("  ♻️  Cached result")
+                    # The key ignores directories; report where the files are now
+                    cached["baseline_path"] = str(baseline_path)
+                    cached["current_path"] = str(current_path)
+                    results_by_name[name] = cached
+                    continue
+
+            tasks.append((baseline_path, current_path, name, thresholds, self.output_dir, options))
+            task_keys.append(key)
+
+        if tasks:
+            with ProcessPoolExecutor(max_workers=os.cpu_count(),
+                                     initializer=_init_worker) as executor:
+                results = executor.map(_compare_pair, tasks, chunksize=4)
+                try:
+                    for key, result in zip(task_keys, results):
+                        if key is not None and result["status"] != "error":
+                            self.store_result(key, result)
+                        results_by_name[result["name"]] = result
+                except BrokenProcessPool as e:
+                    # A worker died (e.g. out of memory); fail the pairs left
+                    print(f"⚠️  Worker process crashed: {e}")
+                    for baseline_path, current_path, name, *_ in tasks:
+                        results_by_name.setdefault(name, {
+                            "name": name,
+                            "status": "error",
+                            "error": f"Worker process crashed: {e}",
+                            "baseline_path": str(baseline_path),
+                            "current_path": str(current_path)
+                        })
+
+        self.comparison_results.extend(results_by_name[name] for name in sorted(common_names))
 
         # Generate comprehensive report
         report = self.generate_report()
 
         # Save detailed results
-        self.save_results()
+        self.save_results(report)
 
         return report
 
-    def compare_single_image(self, baseline_path: Path, current_path: Path, name: str) -> Dict:
-        """Compare two images and return detailed analysis."""
-        print(f"📸 Comparing: {name}")
-
+    def load_hash_cache(self) -> Dict:
+        """Load cached file digests from a previous run."""
         try:
-            # Load images
-            baseline = cv2.imread(str(baseline_path))
-            current = cv2.imread(str(current_path))
-
-            if baseline is None or current is None:
-                return {
-                    "name": name,
-                    "status": "error",
-                    "error": "Failed to load images",
-                    "baseline_exists": baseline is not None,
-                    "current_exists": current is not None
-                }
-
-            # Resize images to match if needed
-            if baseline.shape != current.shape:
-                print(f"  📏 Resizing images: {baseline.shape} vs {current.shape}")
-                min_height = min(baseline.shape[0], current.shape[0])
-                min_width = min(baseline.shape[1], current.shape[1])
-                baseline = cv2.resize(baseline, (min_width, min_height))
-                current = cv2.resize(current, (min_width, min_height))
-
-            # Convert to grayscale for SSIM
-            baseline_gray = cv2.cvtColor(baseline, cv2.COLOR_BGR2GRAY)
-            current_gray = cv2.cvtColor(current, cv2.COLOR_BGR2GRAY)
-
-            # Calculate SSIM
-            ssim_score, ssim_diff = ssim(baseline_gray, current_gray, full=True)
-
-            # Calculate pixel differences
-            diff = cv2.absdiff(baseline, current)
-            diff_percentage = (np.count_nonzero(diff) / diff.size) * 100
-
-            # Calculate color histogram differences
-            hist_diff = self.calculate_histogram_difference(baseline, current)
-
-            # Determine if images match
-            is_match = (
-                ssim_score >= self.ssim_threshold and
-                diff_percentage <= self.pixel_diff_threshold
-            )
-
-            # Generate difference visualization
-            diff_image_path = self.create_difference_visualization(
-                baseline, current, diff, ssim_diff, name
-            )
-
-            result = {
-                "name": name,
-                "status": "pass" if is_match else "fail",
-                "metrics": {
-                    "ssim_score": float(ssim_score),
-                    "pixel_diff_percentage": float(diff_percentage),
-                    "histogram_difference": float(hist_diff),
-                    "baseline_shape": baseline.shape,
-                    "current_shape": current.shape
-                },
-                "thresholds": {
-                    "ssim_threshold": self.ssim_threshold,
-                    "pixel_diff_threshold": self.pixel_diff_threshold
-                },
-                "diff_image": str(diff_image_path.relative_to(self.output_dir)),
-                "baseline_path": str(baseline_path),
-                "current_path": str(current_path)
-            }
-
-            # Log result
-            status_emoji = "✅" if is_match else "❌"
-            print(f"  {status_emoji} SSIM: {ssim_score:.3f}, Diff: {diff_percentage:.2f}%")
-
-            return result
-
-        except Exception as e:
-            return {
-                "name": name,
-                "status": "error",
-                "error": str(e),
-                "baseline_path": str(baseline_path),
-                "current_path": str(current_path)
-            }
-
-    def calculate_histogram_difference(self, img1: np.ndarray, img2: np.ndarray) -> float:
-        """Calculate histogram difference between two images."""
-        hist1 = cv2.calcHist([img1], [0, 1, 2], None, [256, 256, 256], [0, 256, 0, 256, 0, 256])
-        hist2 = cv2.calcHist([img2], [0, 1, 2], None, [256, 256, 256], [0, 256, 0, 256, 0, 256])
-
-        return cv2.compareHist(hist1, hist2, cv2.HISTCMP_CORREL)
-
-    def create_difference_visualization(self, baseline: np.ndarray, current: np.ndarray,
-                                     diff: np.ndarray, ssim_diff: np.ndarray, name: str) -> Path:
-        """Create a comprehensive difference visualization."""
-
-        # Convert SSIM diff to heatmap
-        ssim_heatmap = np.uint8(255 * (1 - ssim_diff))
-        ssim_colored = cv2.applyColorMap(ssim_heatmap, cv2.COLORMAP_JET)
-
-        # Create side-by-side comparison
-        height, width = baseline.shape[:2]
-
-        # Create combined visualization
-        combined_width = width * 4  # baseline, current, diff, ssim
-        combined_height = height + 100  # Extra space for labels
-
-        combined = np.zeros((combined_height, combined_width, 3), dtype=np.uint8)
-
-        # Place images
-        combined[50:50+height, 0:width] = baseline
-        combined[50:50+height, width:width*2] = current
-        combined[50:50+height, width*2:width*3] = diff
-        combined[50:50+height, width*3:width*4] = ssim_colored
-
-        # Convert to PIL for text rendering
-        combined_pil = Image.fromarray(cv2.cvtColor(combined, cv2.COLOR_BGR2RGB))
-        draw = ImageDraw.Draw(combined_pil)
+            with open(self.hash_cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def file_digest(self, entry: os.DirEntry) -> str:
+        """Return the BLAKE2b digest of a file, using the cache when it is fresh."""
+        key = entry.path
+        stat = entry.stat()
+        cached = self.hash_cache.get(key)
+        if cached and cached["mtime"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+            return cached["digest"]
+
+        digest = hashlib.blake2b()
+        with open(entry.path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+
+        self.hash_cache[key] = {
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "digest": digest.hexdigest()
+        }
+        return self.hash_cache[key]["digest"]
 
-        # Add labels
+    def files_identical(self, baseline_entry: os.DirEntry, current_entry: os.DirEntry) -> bool:
+        """Check whether two files have identical contents."""
         try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 20)
-        except:
-            font = ImageFont.load_default()
-
-        labels = ["Baseline", "Current", "Pixel Diff", "SSIM Diff"]
-        for i, label in enumerate(labels):
-            x = i * width + width // 2 - len(label) * 5
-            draw.text((x, 10), label, fill=(255, 255, 255), font=font)
+            if baseline_entry.stat().st_size != current_entry.stat().st_size:
+                return False
+
+            return self.file_digest(baseline_entry) == self.file_digest(current_entry)
+        except OSError:
+            return False
+
+    def result_cache_key(self, baseline_entry: os.DirEntry, current_entry: os.DirEntry,
+                         name: str, thresholds: Dict, options: Dict) -> str:
+        """Build the result cache key for an image pair."""
+        key = hashlib.blake2b()
+        key.update(str(CACHE_VERSION).encode())
+        key.update(self.file_digest(baseline_entry).encode())
+        key.update(self.file_digest(current_entry).encode())
+        key.update(name.encode())
+        key.update(json.dumps(thresholds, sort_keys=True).encode())
+        key.update(json.dumps(options, sort_keys=True).encode())
+
+        return key.hexdigest()
+
+    def diff_image_stamp(self, result: Dict) -> Optional[List[int]]:
+        """Return [mtime_ns, size] of a result's diff image, or None if it has none or it is gone."""
+        try:
+            stat = (self.output_dir / result["diff_image"]).stat()
+        except (KeyError, TypeError, OSError):
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
 
-        # Save combined image
-        diff_path = self.output_dir / f"{name}_diff.png"
-        combined_pil.save(diff_path)
+    def cached_result(self, key: str) -> Optional[Dict]:
+        """Return a cached result, or None if it is missing or its diff image changed.
 
-        return diff_path
+        Diff images are named after the screenshot, so a later comparison of
+        a different pair with the same name overwrites them; the stored
+        mtime and size detect that.
+        """
+        row = self.result_cache.execute(
+            "SELECT result FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        entry = json.loads(row[0])
+        result = entry["result"]
+        if result.get("diff_image") and self.diff_image_stamp(result) != entry["diff_image"]:
+            return None
+
+        return result
+
+    def store_result(self, key: str, result: Dict):
+        """Store a result in the cache; committed by save_results."""
+        entry = {
+            "result": result,
+            "diff_image": self.diff_image_stamp(result)
+        }
+        self.result_cache.execute(
+            "INSERT OR REPLACE INTO cache (key, result) VALUES (?, ?)",
+            (key, json.dumps(entry))
+        )
 
     def generate_report(self) -> Dict:
         """Generate comprehensive test report."""
         total_tests = len(self.comparison_results)
-        passed_tests = sum(1 for r in self.comparison_results if r["status"] == "pass")
-        failed_tests = sum(1 for r in self.comparison_results if r["status"] == "fail")
-        error_tests = sum(1 for r in self.comparison_results if r["status"] == "error")
+
+        # Split results by status in a single pass
+        passed_tests = 0
+        failed = []
+        errors = []
+        for r in self.comparison_results:
+            if r["status"] == "pass":
+                passed_tests += 1
+            elif r["status"] == "fail":
+                failed.append(r)
+            elif r["status"] == "error":
+                errors.append(r)
 
         report = {
             "summary": {
                 "total_tests": total_tests,
                 "passed": passed_tests,
-                "failed": failed_tests,
-                "errors": error_tests,
+                "failed": len(failed),
+                "errors": len(errors),
                 "pass_rate": (passed_tests / total_tests * 100) if total_tests > 0 else 0
             },
-            "failed_tests": [r for r in self.comparison_results if r["status"] == "fail"],
-            "error_tests": [r for r in self.comparison_results if r["status"] == "error"],
+            "failed_tests": failed,
+            "error_tests": errors,
             "thresholds": {
                 "ssim_threshold": self.ssim_threshold,
                 "pixel_diff_threshold": self.pixel_diff_threshold,
@@ -233,14 +600,19 @@ class ScreenshotComparator:
 
         return report
 
-    def save_results(self):
-        """Save detailed results to files."""
+    def save_results(self, report: Optional[Dict] = None):
+        """Save detailed results to files, generating the report if not given."""
         # Save JSON report
-        report = self.generate_report()
+        if report is None:
+            report = self.generate_report()
 
         json_path = self.output_dir / "comparison_report.json"
-        with open(json_path, 'w') as f:
-            json.dump(report, f, indent=2)
+        if orjson is not None:
+            with open(json_path, 'wb') as f:
+                f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            with open(json_path, 'w') as f:
+                json.dump(report, f, indent=2)
 
         # Generate HTML report
         self.generate_html_report(report)
@@ -248,13 +620,20 @@ class ScreenshotComparator:
         # Generate GitHub Actions summary
         self.generate_github_summary(report)
 
+        # Persist file digests and comparison results for the next run
+        if self.cache_dir:
+            with open(self.hash_cache_path, 'w') as f:
+                json.dump(self.hash_cache, f)
+            self.result_cache.commit()
+
         print(f"📊 Results saved to: {self.output_dir}")
 
     def generate_html_report(self, report: Dict):
         """Generate HTML report for visual review."""
         html_path = self.output_dir / "visual_regression_report.html"
 
-        html_content = f"""
+        with open(html_path, 'w') as f:
+            f.write(f"""
         <!DOCTYPE html>
         <html>
         <head>
@@ -282,31 +661,35 @@ class ScreenshotComparator:
                 <p><strong>Errors:</strong> ⚠️ {report['summary']['errors']}</p>
                 <p><strong>Pass Rate:</strong> {report['summary']['pass_rate']:.1f}%</p>
             </div>
-        """
+        """)
 
-        # Add failed tests section
-        if report['failed_tests']:
-            html_content += "<h2>❌ Failed Tests</h2>"
-            for test in report['failed_tests']:
-                html_content += f"""
+            # Add failed tests section
+            if report['failed_tests']:
+                f.write("<h2>❌ Failed Tests</h2>")
+                for test in report['failed_tests']:
+                    f.write(f"""
                 <div class="test-item fail">
                     <h3>{test['name']}</h3>
                     <div class="metrics">
                         SSIM Score: {test['metrics']['ssim_score']:.3f} (threshold: {test['thresholds']['ssim_threshold']})
                         Pixel Diff: {test['metrics']['pixel_diff_percentage']:.2f}% (threshold: {test['thresholds']['pixel_diff_threshold']}%)
-                    </div>
+                    </div>""")
+                    # Fast mode does not produce difference images
+                    if test.get('diff_image'):
+                        f.write(f"""
                     <div class="diff-images">
                         <img src="{test['diff_image']}" alt="Difference visualization">
-                    </div>
+                    </div>""")
+                    f.write("""
                 </div>
-                """
-
-        # Add passed tests section
-        passed_tests = [r for r in report['detailed_results'] if r['status'] == 'pass']
-        if passed_tests:
-            html_content += "<h2>✅ Passed Tests</h2>"
-            for test in passed_tests:
-                html_content += f"""
+                """)
+
+            # Add passed tests section
+            passed_tests = [r for r in report['detailed_results'] if r['status'] == 'pass']
+            if passed_tests:
+                f.write("<h2>✅ Passed Tests</h2>")
+                for test in passed_tests:
+                    f.write(f"""
                 <div class="test-item pass">
                     <h3>{test['name']}</h3>
                     <div class="metrics">
@@ -314,18 +697,16 @@ class ScreenshotComparator:
                         Pixel Diff: {test['metrics']['pixel_diff_percentage']:.2f}%
                     </div>
                 </div>
-                """
+                """)
 
-        html_content += "</body></html>"
-
-        with open(html_path, 'w') as f:
-            f.write(html_content)
+            f.write("</body></html>")
 
     def generate_github_summary(self, report: Dict):
         """Generate GitHub Actions step summary."""
         summary_path = self.output_dir / "github_summary.md"
 
-        summary_content = f"""
+        with open(summary_path, 'w') as f:
+            f.write(f"""
 # 📸 Visual Regression Test Results
 
 ## 📊 Summary
@@ -340,22 +721,22 @@ class ScreenshotComparator:
 - **Pixel Difference**: {report['thresholds']['pixel_diff_threshold']}%
 - **Color Tolerance**: {report['thresholds']['color_tolerance']}
 
-"""
+""")
 
-        if report['failed_tests']:
-            summary_content += "## ❌ Failed Tests\n\n"
-            for test in report['failed_tests']:
-                summary_content += f"### {test['name']}\n"
-                summary_content += f"- **SSIM Score**: {test['metrics']['ssim_score']:.3f} (required: ≥{test['thresholds']['ssim_threshold']})\n"
-                summary_content += f"- **Pixel Diff**: {test['metrics']['pixel_diff_percentage']:.2f}% (required: ≤{test['thresholds']['pixel_diff_threshold']}%)\n\n"
+            if report['failed_tests']:
+                f.write("## ❌ Failed Tests\n\n")
+                for test in report['failed_tests']:
+                    f.write(f"### {test['name']}\n")
+                    f.write(f"- **SSIM Score**: {test['metrics']['ssim_score']:.3f} (required: ≥{test['thresholds']['ssim_threshold']})\n")
+                    f.write(f"- **Pixel Diff**: {test['metrics']['pixel_diff_percentage']:.2f}% (required: ≤{test['thresholds']['pixel_diff_threshold']}%)\n\n")
 
-        if report['error_tests']:
-            summary_content += "## ⚠️ Error Tests\n\n"
-            for test in report['error_tests']:
-                summary_content += f"### {test['name']}\n"
-                summary_content += f"- **Error**: {test.get('error', 'Unknown error')}\n\n"
+            if report['error_tests']:
+                f.write("## ⚠️ Error Tests\n\n")
+                for test in report['error_tests']:
+                    f.write(f"### {test['name']}\n")
+                    f.write(f"- **Error**: {test.get('error', 'Unknown error')}\n\n")
 
-        summary_content += f"""
+            f.write("""
 ## 📁 Artifacts
 - [Full HTML Report](visual_regression_report.html)
 - [JSON Results](comparison_report.json)
@@ -366,10 +747,7 @@ class ScreenshotComparator:
 2. Open `visual_regression_report.html` in a browser
 3. Review failed tests and difference visualizations
 4. Update baseline images if changes are intentional
-"""
-
-        with open(summary_path, 'w') as f:
-            f.write(summary_content)
+""")
 
 
 def main():
@@ -377,16 +755,28 @@ def main():
     parser.add_argument("--baseline", required=True, help="Directory containing baseline images")
     parser.add_argument("--current", required=True, help="Directory containing current images")
     parser.add_argument("--output", required=True, help="Output directory for results")
+    parser.add_argument("--cache-dir", help="Directory for caches reused across runs (disabled if omitted)")
     parser.add_argument("--ssim-threshold", type=float, default=0.95, help="SSIM threshold for passing")
     parser.add_argument("--pixel-threshold", type=float, default=2.0, help="Pixel difference threshold (%)")
     parser.add_argument("--fail-on-diff", action="store_true", help="Exit with error code if differences found")
+    parser.add_argument("--ssim-scale", type=float, default=1.0,
+                        help="Downsample factor in (0, 1] applied before computing SSIM; values below "
+                             "1.0 are faster but smooth out fine detail and can change results")
+    parser.add_argument("--fast", action="store_true",
+                        help="Compare in grayscale only, skipping histograms and difference images; "
+                             "pixel differences are measured on luminance, so pass/fail can differ "
+                             "from a full comparison (e.g. hue-only changes pass)")
 
     args = parser.parse_args()
+    if not 0 < args.ssim_scale <= 1:
+        parser.error("--ssim-scale must be in (0, 1]")
 
     # Create comparator
-    comparator = ScreenshotComparator(args.baseline, args.current, args.output)
+    comparator = ScreenshotComparator(args.baseline, args.current, args.output, args.cache_dir)
     comparator.ssim_threshold = args.ssim_threshold
     comparator.pixel_diff_threshold = args.pixel_threshold
+    comparator.fast = args.fast
+    comparator.ssim_scale = args.ssim_scale
 
     # Run comparison
     report = comparator.compare_screenshots()